@@ -2,14 +2,99 @@ import boto3
 import json
 import hashlib
 import os
+import time
 from boto3.dynamodb.conditions import Attr, ConditionBase
-from functools import reduce
-from typing import Generator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from functools import cache, reduce
+from typing import Callable, Generator, Iterator
+
+METRICS_NAMESPACE: str = "WebNovelGrepper"
+
+# メトリクスの出力先 (Lambdaでは標準出力 = CloudWatch Logs、テストでは差し替える)
+metrics_sink: Callable[[str], None] = print
+
+
+# リクエスト単位のメトリクス (CloudWatch EMF形式で1行のJSONとして出力する)
+@dataclass
+class Metrics:
+    function: str
+    values: dict[str, float] = field(default_factory=dict)
+    units: dict[str, str] = field(default_factory=dict)
+    properties: dict[str, object] = field(default_factory=dict)
+
+    # 同名のメトリクスは加算する
+    def add(self, name: str, value: float, unit: str = "Count") -> None:
+        self.values[name] = self.values.get(name, 0) + value
+        self.units[name] = unit
+
+    # ブロックの処理時間をミリ秒で加算する
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000, "Milliseconds")
+
+    def emit(self) -> None:
+        document = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": METRICS_NAMESPACE,
+                        "Dimensions": [["Function"]],
+                        "Metrics": [
+                            {"Name": name, "Unit": unit}
+                            for name, unit in self.units.items()
+                        ],
+                    }
+                ],
+            },
+            "Function": self.function,
+            **self.properties,
+            **self.values,
+        }
+        metrics_sink(json.dumps(document, ensure_ascii=False, default=str))
+
+
+# コールドスタート対策: クライアントは作り直さずコンテナ内で使い回す
+@cache
+def get_table(table_name: str):
+    return boto3.resource("dynamodb").Table(table_name)
+
+
+@cache
+def get_s3_client():
+    return boto3.client("s3")
+
+
+# ウォームアップ: 接続を張り、scanを1回流しておく
+def warmup(table_name: str, bucket_name: str, metrics: Metrics) -> None:
+    table = get_table(table_name)
+    with metrics.timer("DynamoDBConnectTime"):
+        table.load()
+    with metrics.timer("S3ConnectTime"):
+        get_s3_client().head_bucket(Bucket=bucket_name)
+    # 初回のscanはリクエストの組み立て・パースの準備が走って遅いので、1件だけ読んで済ませておく
+    # (Limitはフィルタ前に効くので、作品ごとに流しても同じ1件を読むだけ)
+    with metrics.timer("ScanPrimeTime"):
+        table.scan(Limit=1, ReturnConsumedCapacity="TOTAL")
+
 
 # 注　ジェネレータなので使い切り
-def get_records(table, **kwargs) -> Generator[dict, None, None]:
+def get_records(table, metrics: Metrics | None = None, **kwargs) -> Generator[dict, None, None]:
     while True:
         response = table.scan(**kwargs)
+        if metrics:
+            metrics.add("ScanPages", 1)
+            metrics.add("ItemsScanned", response.get("ScannedCount", 0))
+            metrics.add("ItemsReturned", response.get("Count", len(response["Items"])))
+            metrics.add(
+                "ConsumedReadCapacity",
+                response.get("ConsumedCapacity", {}).get("CapacityUnits", 0),
+            )
         for item in response["Items"]:
             yield item
         if "LastEvaluatedKey" not in response:
@@ -21,6 +106,17 @@ def lambda_handler(event, context):
     TABLE_NAME: str = os.environ.get("TABLE_NAME")
     BUCKET_NAME: str = os.environ.get("BUCKET_NAME")
 
+    if event.get("warmup"):
+        metrics = Metrics("backend")
+        metrics.properties.update(
+            RequestId=getattr(context, "aws_request_id", None),
+            Warmup=True,
+        )
+        with metrics.timer("WarmupTime"):
+            warmup(TABLE_NAME, BUCKET_NAME, metrics)
+        metrics.emit()
+        return {"statusCode": 200, "body": "OK"}
+
     query_params: dict = event.get("queryStringParameters", {})
     words_string: str = query_params.get("words", "")
     work_id: int = int(query_params.get("work_id", 0))
@@ -47,35 +143,58 @@ def lambda_handler(event, context):
     # reduceで全条件をANDで結合
     combined_condition: ConditionBase = reduce(lambda acc, cond: acc & cond, conditions) & Attr("work_id").eq(work_id)
 
-    dynamodb = boto3.resource("dynamodb")
-    records: Generator[dict, None, None] = get_records(
-        dynamodb.Table(TABLE_NAME), FilterExpression=combined_condition
+    metrics = Metrics("backend")
+    metrics.properties.update(
+        RequestId=getattr(context, "aws_request_id", None),
+        WorkId=work_id,
+        WordCount=len(words),
     )
 
-    sorted_records: list[dict] = sorted(
-        records, key=lambda record: f"{record['episode_id']}{record['line']:04}"
-    )
+    with metrics.timer("ScanTime"):
+        records: list[dict] = list(
+            get_records(
+                get_table(TABLE_NAME),
+                metrics,
+                FilterExpression=combined_condition,
+                ReturnConsumedCapacity="TOTAL",
+            )
+        )
+
+    with metrics.timer("SortTime"):
+        sorted_records: list[dict] = sorted(
+            records, key=lambda record: f"{record['episode_id']}{record['line']:04}"
+        )
 
     # 作品ID、話数IDがjsのnumberで扱いきれないのでDBのNumberは全部文字列にしてしまう
-    json_string = json.dumps(sorted_records, default=lambda obj: str(obj))
+    with metrics.timer("SerializeTime"):
+        json_string = json.dumps(sorted_records, default=lambda obj: str(obj))
 
     binary_size = len(json_string.encode("utf-8"))
     print(f"Binary size: {binary_size} bytes")
+    metrics.add("PayloadBytes", binary_size, "Bytes")
+    # キャッシュの参照はフロントがS3に直接行うので、ここに来るのはキャッシュミスのみ
+    metrics.add("CacheMiss", 1)
 
     # save json cache to S3 (50MB超えてるなら様子がおかしいので保存しない)
     if binary_size < 50 * 1024 * 1024:
         hash_object = hashlib.sha256()
         hash_object.update(words_string.encode('utf-8'))
         words_hash: str = hash_object.hexdigest()
-        s3 = boto3.client("s3")
-        s3.put_object(Bucket=BUCKET_NAME, Key=f"cache/{work_id}/{words_hash}.json", Body=json_string)
+        with metrics.timer("CacheWriteTime"):
+            get_s3_client().put_object(Bucket=BUCKET_NAME, Key=f"cache/{work_id}/{words_hash}.json", Body=json_string)
+        metrics.add("CacheWrites", 1)
     else:
         print("Too large response. Not save to S3")
+        metrics.add("CacheWrites", 0)
 
     # 6MBを超えるならエラー
     if binary_size > 6 * 1024 * 1024 - 100:
+        metrics.properties["StatusCode"] = 503
+        metrics.emit()
         return {"statusCode": 503, "body": "Too large response"}
 
+    metrics.properties["StatusCode"] = 200
+    metrics.emit()
     return {"statusCode": 200, "body": json_string}
 
 
@@ -1,7 +1,7 @@
 import json
 import pytest
 from unittest.mock import patch, MagicMock
-from backend.lambda_function import lambda_handler
+from backend.lambda_function import get_s3_client, get_table, lambda_handler
 
 
 @pytest.fixture(autouse=True)
@@ -11,6 +11,16 @@ def mock_env(monkeypatch):
     monkeypatch.setenv("BUCKET_NAME", "TestBucket")
 
 
+@pytest.fixture(autouse=True)
+def clear_clients():
+    """使い回しているクライアントがテスト間でモックを持ち越さないようにする"""
+    get_table.cache_clear()
+    get_s3_client.cache_clear()
+    yield
+    get_table.cache_clear()
+    get_s3_client.cache_clear()
+
+
 @patch("boto3.resource")
 @patch("boto3.client")
 def test_missing_words(mock_boto3_client, mock_boto3_resource):
@@ -181,3 +191,128 @@ def test_over_50mb_response(mock_boto3_client, mock_boto3_resource):
 
     # 50MB超過したら保存しない
     mock_s3.put_object.assert_not_called()
+
+
+@patch("boto3.resource")
+@patch("boto3.client")
+def test_metrics_emitted(mock_boto3_client, mock_boto3_resource, monkeypatch):
+    """
+    検索ごとにEMF形式のメトリクスが1行出力されるテスト
+      - scanの回数、スキャン件数/ヒット件数、消費キャパシティが合算される
+      - 各フェーズの処理時間とペイロードサイズが含まれる
+    """
+    sink = []
+    monkeypatch.setattr("backend.lambda_function.metrics_sink", sink.append)
+
+    mock_table = MagicMock()
+    # 2ページに分かれたscan
+    mock_table.scan.side_effect = [
+        {
+            "Items": [{"episode_id": "1", "line": 1, "body": "テスト"}],
+            "Count": 1,
+            "ScannedCount": 100,
+            "ConsumedCapacity": {"TableName": "TestTable", "CapacityUnits": 12.5},
+            "LastEvaluatedKey": {"id": "x"},
+        },
+        {
+            "Items": [{"episode_id": "2", "line": 3, "body": "テスト"}],
+            "Count": 1,
+            "ScannedCount": 50,
+            "ConsumedCapacity": {"TableName": "TestTable", "CapacityUnits": 6.0},
+        },
+    ]
+    mock_boto3_resource.return_value.Table.return_value = mock_table
+
+    event = {
+        "queryStringParameters": {
+            "words": "テスト",
+            "work_id": "123"
+        }
+    }
+    response = lambda_handler(event, None)
+    assert response["statusCode"] == 200
+
+    # 消費キャパシティを返すようscanしている
+    for call in mock_table.scan.call_args_list:
+        assert call.kwargs["ReturnConsumedCapacity"] == "TOTAL"
+
+    assert len(sink) == 1
+    metrics = json.loads(sink[0])
+    assert metrics["Function"] == "backend"
+    assert metrics["WorkId"] == 123
+    assert metrics["StatusCode"] == 200
+    assert metrics["ScanPages"] == 2
+    assert metrics["ItemsScanned"] == 150
+    assert metrics["ItemsReturned"] == 2
+    assert metrics["ConsumedReadCapacity"] == 18.5
+    assert metrics["CacheMiss"] == 1
+    assert metrics["CacheWrites"] == 1
+    assert metrics["PayloadBytes"] == len(response["body"].encode("utf-8"))
+    for name in ["ScanTime", "SortTime", "SerializeTime", "CacheWriteTime"]:
+        assert metrics[name] >= 0
+
+    # EMFのメタデータに全メトリクスが定義されている
+    definition = metrics["_aws"]["CloudWatchMetrics"][0]
+    assert definition["Dimensions"] == [["Function"]]
+    names = {m["Name"] for m in definition["Metrics"]}
+    assert {"ScanTime", "ItemsScanned", "PayloadBytes"} <= names
+
+
+@patch("boto3.resource")
+@patch("boto3.client")
+def test_clients_are_reused(mock_boto3_client, mock_boto3_resource):
+    """2回目以降のリクエストではクライアントを作り直さないこと"""
+    mock_boto3_resource.return_value.Table.return_value.scan.return_value = {
+        "Items": [{"episode_id": "1", "line": 1, "body": "テスト"}]
+    }
+
+    event = {
+        "queryStringParameters": {
+            "words": "テスト",
+            "work_id": "123"
+        }
+    }
+    lambda_handler(event, None)
+    lambda_handler(event, None)
+
+    mock_boto3_resource.assert_called_once_with("dynamodb")
+    mock_boto3_client.assert_called_once_with("s3")
+    assert mock_boto3_client.return_value.put_object.call_count == 2
+
+
+@patch("boto3.resource")
+@patch("boto3.client")
+def test_warmup(mock_boto3_client, mock_boto3_resource, monkeypatch):
+    """
+    ウォームアップ:
+      - DynamoDB/S3に接続し、scanを1回(1件だけ)流す
+      - 後続の検索は同じクライアントを使う
+    """
+    sink = []
+    monkeypatch.setattr("backend.lambda_function.metrics_sink", sink.append)
+    mock_table = mock_boto3_resource.return_value.Table.return_value
+    mock_table.scan.return_value = {"Items": []}
+    mock_s3 = mock_boto3_client.return_value
+
+    response = lambda_handler({"warmup": True}, None)
+    assert response["statusCode"] == 200
+
+    mock_table.load.assert_called_once()
+    mock_s3.head_bucket.assert_called_once_with(Bucket="TestBucket")
+    mock_table.scan.assert_called_once_with(Limit=1, ReturnConsumedCapacity="TOTAL")
+    mock_s3.put_object.assert_not_called()
+
+    metrics = json.loads(sink[0])
+    assert metrics["Warmup"] is True
+    assert metrics["ScanPrimeTime"] >= 0
+    assert metrics["WarmupTime"] >= 0
+
+    event = {
+        "queryStringParameters": {
+            "words": "テスト",
+            "work_id": "123"
+        }
+    }
+    lambda_handler(event, None)
+    mock_boto3_resource.assert_called_once_with("dynamodb")
+    mock_boto3_client.assert_called_once_with("s3")
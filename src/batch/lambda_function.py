@@ -1,20 +1,34 @@
-import requests
+from __future__ import annotations
+
 import os
 import time
 import boto3
+import json
 import re
-from bs4 import BeautifulSoup, Tag
-from functools import reduce
-from dataclasses import dataclass
-from dotenv import load_dotenv
+from contextlib import contextmanager
+from functools import cache, reduce
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Callable, Iterator
+
+# requests/bs4は読み込みが重いので、スクレイピング時に初めてimportする
+if TYPE_CHECKING:
+    from bs4 import Tag
 
 
 # 定数類
-load_dotenv()
+# .envはローカル実行用 (Lambdaでは環境変数が設定済みなので読まない)
+if "AWS_LAMBDA_FUNCTION_NAME" not in os.environ:
+    from dotenv import load_dotenv
+
+    load_dotenv()
 WORK_URLS: list[str] = os.environ.get("WORK_URLS", "").split(",")
 DFAULT_TARGET_RATE: int = 5
 TABLE_NAME: str = os.environ.get("TABLE_NAME")
 BUCKET_NAME: str = os.environ.get("BUCKET_NAME")
+METRICS_NAMESPACE: str = "WebNovelGrepper"
+
+# メトリクスの出力先 (Lambdaでは標準出力 = CloudWatch Logs、テストでは差し替える)
+metrics_sink: Callable[[str], None] = print
 
 
 # 作品のサイドバーから得られる情報
@@ -44,11 +58,74 @@ class Record:
     line: Line
 
 
+# 処理単位のメトリクス (CloudWatch EMF形式で1行のJSONとして出力する)
+@dataclass
+class Metrics:
+    function: str
+    values: dict[str, float] = field(default_factory=dict)
+    units: dict[str, str] = field(default_factory=dict)
+    properties: dict[str, object] = field(default_factory=dict)
+
+    # 同名のメトリクスは加算する
+    def add(self, name: str, value: float, unit: str = "Count") -> None:
+        self.values[name] = self.values.get(name, 0) + value
+        self.units[name] = unit
+
+    # ブロックの処理時間をミリ秒で加算する
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(name, (time.perf_counter() - start) * 1000, "Milliseconds")
+
+    def emit(self) -> None:
+        document = {
+            "_aws": {
+                "Timestamp": int(time.time() * 1000),
+                "CloudWatchMetrics": [
+                    {
+                        "Namespace": METRICS_NAMESPACE,
+                        "Dimensions": [["Function"]],
+                        "Metrics": [
+                            {"Name": name, "Unit": unit}
+                            for name, unit in self.units.items()
+                        ],
+                    }
+                ],
+            },
+            "Function": self.function,
+            **self.properties,
+            **self.values,
+        }
+        metrics_sink(json.dumps(document, ensure_ascii=False, default=str))
+
+
+# コールドスタート対策: リソースは作り直さずコンテナ内で使い回す
+@cache
+def get_table(table_name: str):
+    return boto3.resource("dynamodb").Table(table_name)
+
+
+@cache
+def get_bucket(bucket_name: str):
+    return boto3.resource("s3").Bucket(bucket_name)
+
+
 # URLからHTMLを取得し、root要素を取り出す
-def get_root_element(url: str) -> Tag:
-    response = requests.get(url)
-    response.raise_for_status()
-    return BeautifulSoup(response.content, "html.parser")
+def get_root_element(url: str, metrics: Metrics | None = None) -> Tag:
+    import requests
+    from bs4 import BeautifulSoup
+
+    metrics = metrics or Metrics("batch")
+    with metrics.timer("FetchTime"):
+        response = requests.get(url)
+        response.raise_for_status()
+    metrics.add("PagesFetched", 1)
+    metrics.add("BytesFetched", len(response.content), "Bytes")
+    with metrics.timer("ParseTime"):
+        return BeautifulSoup(response.content, "html.parser")
 
 
 # サイドバーのli要素を全て取り出す
@@ -88,9 +165,10 @@ def get_body_lines(root_element: Tag) -> list[Line]:
 
 
 # DynamoDBにレコードを追加する
-def put_records_to_dynamodb(records: list[Record]):
-    dynamodb = boto3.resource("dynamodb")
-    table = dynamodb.Table(TABLE_NAME)
+def put_records_to_dynamodb(records: list[Record], metrics: Metrics | None = None):
+    metrics = metrics or Metrics("batch")
+    table = get_table(TABLE_NAME)
+    metrics.add("RecordsWritten", 0)
     with table.batch_writer() as batch:
         for record in records:
             # display progress
@@ -105,10 +183,24 @@ def put_records_to_dynamodb(records: list[Record]):
                     "body": record.line.body,
                 }
             )
+            metrics.add("RecordsWritten", 1)
 
 
 # 処理実体
 def lambda_handler(event, context):
+    # ウォームアップならリソースを用意して終わり
+    if event and event.get("warmup"):
+        metrics = Metrics("batch")
+        metrics.properties.update(
+            RequestId=getattr(context, "aws_request_id", None),
+            Warmup=True,
+        )
+        with metrics.timer("WarmupTime"):
+            get_table(TABLE_NAME).load()
+            get_bucket(BUCKET_NAME)
+        metrics.emit()
+        return
+
     # 最新何%ぐらいを処理するか
     target_rate: int = (
         event.get("target_rate", DFAULT_TARGET_RATE) if event else DFAULT_TARGET_RATE
@@ -116,9 +208,15 @@ def lambda_handler(event, context):
 
     for url in WORK_URLS:
         side_bar_url: str = url + "/episode_sidebar"
+        metrics = Metrics("batch")
+        metrics.properties.update(
+            RequestId=getattr(context, "aws_request_id", None),
+            WorkUrl=url,
+            TargetRate=target_rate,
+        )
 
         # episodeリストの取得
-        side_bar_root_element: Tag = get_root_element(side_bar_url)
+        side_bar_root_element: Tag = get_root_element(side_bar_url, metrics)
         li_elements: list[Tag] = get_all_li_elements(side_bar_root_element)
         _, episodes = reduce(
             get_episodes, li_elements, ("", [])
@@ -132,13 +230,15 @@ def lambda_handler(event, context):
 
         def get_records(acc: list[Record], episode: Episode) -> list[Record]:
             # ちょっと待つ
-            time.sleep(0.5)
+            with metrics.timer("SleepTime"):
+                time.sleep(0.5)
             # display progress
             print(f"Processing {episode.number}")
+            metrics.add("EpisodesProcessed", 1)
             # linesを取得し、episode左結合 累積リストに追加　(空行は無視)
-            lines = get_body_lines(
-                get_root_element(url_prefix + str(episode.episode_id))
-            )
+            root_element = get_root_element(url_prefix + str(episode.episode_id), metrics)
+            with metrics.timer("ParseTime"):
+                lines = list(get_body_lines(root_element))
             valid_lines = filter(lambda line: line.body.strip(), lines)
             return [*acc, *map(lambda line: Record(episode, line), valid_lines)]
 
@@ -146,13 +246,20 @@ def lambda_handler(event, context):
         records: list[Record] = reduce(get_records, episodes[start_episode_num:], [])
 
         # DynamoDBに永続化
-        put_records_to_dynamodb(records)
+        with metrics.timer("WriteTime"):
+            put_records_to_dynamodb(records, metrics)
+        metrics.emit()
 
     # remove cache from S3
-    s3 = boto3.resource("s3")
-    bucket = s3.Bucket(BUCKET_NAME)
-    for obj in bucket.objects.filter(Prefix="cache/"):
-        obj.delete()
+    metrics = Metrics("batch")
+    metrics.properties["RequestId"] = getattr(context, "aws_request_id", None)
+    bucket = get_bucket(BUCKET_NAME)
+    metrics.add("CacheObjectsDeleted", 0)
+    with metrics.timer("CacheClearTime"):
+        for obj in bucket.objects.filter(Prefix="cache/"):
+            obj.delete()
+            metrics.add("CacheObjectsDeleted", 1)
+    metrics.emit()
 
 
 # Example usage
@@ -1,8 +1,11 @@
+import json
 import pytest
 from unittest.mock import patch, MagicMock
 
 from bs4 import BeautifulSoup
 from batch.lambda_function import (
+    get_bucket,
+    get_table,
     get_root_element,
     get_all_li_elements,
     get_episodes,
@@ -11,9 +14,20 @@ from batch.lambda_function import (
     lambda_handler,
     Episode,
     Line,
+    Metrics,
     Record
 )
 
+@pytest.fixture(autouse=True)
+def clear_resources():
+    """使い回しているリソースがテスト間でモックを持ち越さないようにする"""
+    get_table.cache_clear()
+    get_bucket.cache_clear()
+    yield
+    get_table.cache_clear()
+    get_bucket.cache_clear()
+
+
 ###############################################################################
 # get_root_element のテスト
 ###############################################################################
@@ -283,3 +297,101 @@ def test_lambda_handler(
     # エピソード2話分 × 各話に2行(空文字は除外される) = 4アイテム
     # S3キャッシュ削除が呼ばれたこと
     mock_s3_bucket.objects.filter.assert_called_once_with(Prefix="cache/")
+
+
+###############################################################################
+# メトリクス出力のテスト
+###############################################################################
+@patch("requests.get")
+def test_get_root_element_metrics(mock_get):
+    """取得と解析の時間、取得バイト数が記録されること"""
+
+    mock_response = MagicMock()
+    mock_response.content = b"<html><body><p>Hello World</p></body></html>"
+    mock_get.return_value = mock_response
+
+    metrics = Metrics("batch")
+    get_root_element("https://example.com", metrics)
+    get_root_element("https://example.com", metrics)
+
+    assert metrics.values["PagesFetched"] == 2
+    assert metrics.values["BytesFetched"] == 2 * len(mock_response.content)
+    assert metrics.units["BytesFetched"] == "Bytes"
+    assert metrics.units["FetchTime"] == "Milliseconds"
+    assert metrics.units["ParseTime"] == "Milliseconds"
+
+
+@patch("time.sleep", return_value=None)
+@patch("boto3.resource")
+@patch("requests.get")
+def test_lambda_handler_metrics(
+    mock_requests_get, mock_boto3_resource, mock_time_sleep, monkeypatch
+):
+    """作品ごとの取得/解析/書き込みと、キャッシュ削除のメトリクスが出力されること"""
+
+    sink = []
+    monkeypatch.setattr("batch.lambda_function.metrics_sink", sink.append)
+    monkeypatch.setattr(
+        "batch.lambda_function.WORK_URLS", ["https://test.com/episodes/123"]
+    )
+
+    sidebar_html = """
+    <ol class="widget-toc-items">
+      <li class="widget-toc-chapter"><span>Chapter1</span></li>
+      <li><span>Ep1</span><a href="https://test.com/episodes/123/episode/111">ep1</a></li>
+    </ol>
+    """
+    episode_body_html = """
+    <div class="widget-episodeBody">
+      <p id="L1">Line1</p>
+      <p id="L2">Line2</p>
+    </div>
+    """
+
+    def mock_requests_side_effect(url, *args, **kwargs):
+        mock_resp = MagicMock()
+        html = sidebar_html if "episode_sidebar" in url else episode_body_html
+        mock_resp.content = html.encode("utf-8")
+        return mock_resp
+
+    mock_requests_get.side_effect = mock_requests_side_effect
+    mock_boto3_resource.return_value.Bucket.return_value.objects.filter.return_value = [
+        MagicMock(),
+        MagicMock(),
+    ]
+
+    lambda_handler({"target_rate": 100}, None)
+
+    assert len(sink) == 2
+    work_metrics, cache_metrics = map(json.loads, sink)
+
+    assert work_metrics["Function"] == "batch"
+    assert work_metrics["WorkUrl"] == "https://test.com/episodes/123"
+    # サイドバー + 本文1話
+    assert work_metrics["PagesFetched"] == 2
+    assert work_metrics["EpisodesProcessed"] == 1
+    assert work_metrics["RecordsWritten"] == 2
+    for name in ["FetchTime", "ParseTime", "WriteTime", "SleepTime"]:
+        assert work_metrics[name] >= 0
+
+    assert cache_metrics["CacheObjectsDeleted"] == 2
+    assert cache_metrics["CacheClearTime"] >= 0
+
+
+###############################################################################
+# ウォームアップのテスト
+###############################################################################
+@patch("requests.get")
+@patch("boto3.resource")
+def test_lambda_handler_warmup(mock_boto3_resource, mock_requests_get, monkeypatch):
+    """ウォームアップではスクレイピングもキャッシュ削除もしないこと"""
+
+    sink = []
+    monkeypatch.setattr("batch.lambda_function.metrics_sink", sink.append)
+
+    lambda_handler({"warmup": True}, None)
+
+    mock_requests_get.assert_not_called()
+    mock_boto3_resource.return_value.Table.return_value.load.assert_called_once()
+    mock_boto3_resource.return_value.Bucket.return_value.objects.filter.assert_not_called()
+    assert json.loads(sink[0])["Warmup"] is True
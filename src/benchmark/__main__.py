@@ -0,0 +1,40 @@
+import argparse
+import json
+from dataclasses import asdict
+
+from benchmark.harness import IMPORT_BUDGET_SECONDS, format_report, measure_import, run
+
+# 使い方 (srcディレクトリで実行):
+#   python -m benchmark --sizes 20,100 --repeat 20 --json result.json
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="WebNovelGrepper benchmark")
+    parser.add_argument("--sizes", default="20,100", help="コーパスの話数 (カンマ区切り)")
+    parser.add_argument("--lines", type=int, default=80, help="1話あたりの行数")
+    parser.add_argument("--repeat", type=int, default=20, help="クエリごとの試行回数")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--polite", action="store_true", help="バッチの待ち時間(0.5秒/話)も含める")
+    parser.add_argument("--json", help="結果をJSONで保存するパス")
+    args = parser.parse_args()
+
+    imports = [measure_import(module) for module in IMPORT_BUDGET_SECONDS]
+    ingests, queries, cold_starts = run(
+        [int(size) for size in args.sizes.split(",")],
+        lines_per_episode=args.lines,
+        repeat=args.repeat,
+        seed=args.seed,
+        polite=args.polite,
+    )
+    print(format_report(ingests, queries, cold_starts, imports))
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(
+                {
+                    "ingest": [asdict(r) for r in ingests],
+                    "search": [asdict(r) for r in queries],
+                    "first_request": [asdict(r) for r in cold_starts],
+                    "import": [asdict(r) for r in imports],
+                },
+                f,
+                indent=2,
+            )
@@ -0,0 +1,126 @@
+import random
+from dataclasses import dataclass
+from html import escape
+
+# 本文の材料 (検索語と衝突しないよう「ヴ」は含めない)
+HIRAGANA: str = "あいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+KATAKANA: str = "アイウエオカキクケコサシスセソタチツテトナニヌネノハヒフヘホマミムメモヤユヨラリルレロワン"
+KANJI: str = "日月火水木金土山川田人口目耳手足力心刀弓矢王国家空海風雨雪花草森林石光影夢声道門"
+
+# 出現頻度を制御して埋め込む検索語
+COMMON_WORD: str = "魔法"
+COMMON_RATE: float = 0.1
+RARE_WORD: str = "ブロッコリー"
+RARE_RATE: float = 0.002
+PAIR_WORDS: tuple[str, str] = ("勇者", "約束")
+PAIR_RATE: float = 0.15
+# 生成文字に含まれない文字で構成されるので必ず0件になる
+MISSING_WORD: str = "ヴァルハラ"
+
+# 空行(バッチで捨てられる)の割合
+BLANK_RATE: float = 0.2
+
+
+# 合成した話
+@dataclass(frozen=True)
+class SyntheticEpisode:
+    episode_id: int
+    sub_title: str
+    number: str
+    # 行番号は1始まりで、空行は空文字
+    lines: tuple[str, ...]
+
+
+# 合成した作品
+@dataclass(frozen=True)
+class SyntheticWork:
+    work_id: int
+    episodes: tuple[SyntheticEpisode, ...]
+
+    # 空行を除いた行数 (= DynamoDBに保存されるレコード数)
+    @property
+    def record_count(self) -> int:
+        return sum(1 for e in self.episodes for line in e.lines if line)
+
+
+# 漢字+ひらがな、またはカタカナの語をつなげて日本語っぽい1行を作る
+def generate_line(rng: random.Random) -> str:
+    if rng.random() < BLANK_RATE:
+        return ""
+
+    chunks: list[str] = []
+    for _ in range(rng.randint(3, 12)):
+        if rng.random() < 0.2:
+            chunks.append("".join(rng.choices(KATAKANA, k=rng.randint(2, 5))))
+        else:
+            chunks.append(
+                "".join(rng.choices(KANJI, k=rng.randint(1, 2)))
+                + "".join(rng.choices(HIRAGANA, k=rng.randint(1, 4)))
+            )
+        chunks.append(rng.choice(["", "", "、"]))
+
+    if rng.random() < COMMON_RATE:
+        chunks.insert(rng.randrange(len(chunks)), COMMON_WORD)
+    if rng.random() < RARE_RATE:
+        chunks.insert(rng.randrange(len(chunks)), RARE_WORD)
+    for word in PAIR_WORDS:
+        if rng.random() < PAIR_RATE:
+            chunks.insert(rng.randrange(len(chunks)), word)
+
+    return "".join(chunks) + "。"
+
+
+# 作品を生成する (同じ引数なら同じ作品になる)
+def generate_work(
+    work_id: int,
+    episode_count: int,
+    lines_per_episode: int = 80,
+    episodes_per_chapter: int = 10,
+    seed: int = 0,
+) -> SyntheticWork:
+    rng = random.Random(f"{seed}:{work_id}")
+    episodes = tuple(
+        SyntheticEpisode(
+            # DynamoDBのキーは話数IDなので作品をまたいでも一意にする
+            episode_id=work_id * 100000 + i + 1,
+            sub_title=f"第{i // episodes_per_chapter + 1}章",
+            number=f"第{i + 1}話",
+            lines=tuple(generate_line(rng) for _ in range(lines_per_episode)),
+        )
+        for i in range(episode_count)
+    )
+    return SyntheticWork(work_id, episodes)
+
+
+# サイドバーのHTML (batch.get_all_li_elements / get_episodes が読む形)
+def render_sidebar(work: SyntheticWork) -> str:
+    items: list[str] = []
+    sub_title = None
+    for episode in work.episodes:
+        if episode.sub_title != sub_title:
+            sub_title = episode.sub_title
+            items.append(
+                f'<li class="widget-toc-chapter"><span>{escape(sub_title)}</span></li>'
+            )
+        items.append(
+            f'<li class="widget-toc-episode">'
+            f'<a href="/works/{work.work_id}/episodes/{episode.episode_id}">'
+            f"<span>{escape(episode.number)}</span></a></li>"
+        )
+    return (
+        '<html><body><ol class="widget-toc-items">'
+        + "".join(items)
+        + "</ol></body></html>"
+    )
+
+
+# 本文のHTML (batch.get_body_lines が読む形)
+def render_episode(episode: SyntheticEpisode) -> str:
+    paragraphs = "".join(
+        f'<p id="p{n}">{escape(line)}</p>' if line else f'<p id="p{n}" class="blank"><br /></p>'
+        for n, line in enumerate(episode.lines, start=1)
+    )
+    return (
+        f"<html><body><h1>{escape(episode.number)}</h1>"
+        f'<div class="widget-episodeBody">{paragraphs}</div></body></html>'
+    )
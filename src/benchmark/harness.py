@@ -0,0 +1,321 @@
+import contextlib
+import json
+import os
+import subprocess
+import sys
+import time
+import tracemalloc
+from dataclasses import dataclass
+from typing import Callable
+from unittest.mock import patch
+
+import boto3
+from moto import mock_aws
+
+import backend.lambda_function as backend_lambda
+import batch.lambda_function as batch_lambda
+from benchmark.corpus import (
+    COMMON_WORD,
+    MISSING_WORD,
+    PAIR_WORDS,
+    RARE_WORD,
+    SyntheticWork,
+    generate_work,
+)
+from benchmark.server import CorpusServer
+
+TABLE_NAME: str = "BenchmarkTable"
+BUCKET_NAME: str = "benchmark-bucket"
+REGION: str = "ap-northeast-1"
+WORK_ID: int = 1000000000000001
+
+# クエリの種類ごとの検索語 (ヒット率が異なる)
+QUERY_CLASSES: dict[str, str] = {
+    "common": COMMON_WORD,
+    "rare": RARE_WORD,
+    "and": ",".join(PAIR_WORDS),
+    "miss": MISSING_WORD,
+}
+
+# Lambdaモジュールのimport時間の上限 (コールドスタートの初期化時間に直結する)
+IMPORT_BUDGET_SECONDS: dict[str, float] = {
+    "backend.lambda_function": 1.0,
+    "batch.lambda_function": 1.0,
+}
+# 検索に不要なのでimport時に読み込まれてはいけないモジュール
+HEAVY_MODULES: tuple[str, ...] = ("bs4", "requests", "dotenv")
+
+
+# バッチ(取り込み)の計測結果
+@dataclass(frozen=True)
+class IngestResult:
+    episodes: int
+    records: int
+    seconds: float
+    records_per_second: float
+    pages_per_second: float
+    peak_memory_bytes: int
+
+
+# 検索の計測結果
+@dataclass(frozen=True)
+class QueryResult:
+    episodes: int
+    query_class: str
+    hits: int
+    items_scanned: int
+    p50_ms: float
+    p95_ms: float
+    peak_memory_bytes: int
+
+
+# Lambdaモジュールのimport時間
+@dataclass(frozen=True)
+class ImportResult:
+    module: str
+    seconds: float
+    budget_seconds: float
+    heavy_modules: tuple[str, ...]
+
+
+# 初回リクエストのレイテンシ (クライアント未作成 / ウォームアップ後 / 定常時)
+@dataclass(frozen=True)
+class ColdStartResult:
+    episodes: int
+    cold_ms: float
+    warmed_ms: float
+    warm_ms: float
+
+
+# nearest-rank法のパーセンタイル
+def percentile(samples: list[float], p: float) -> float:
+    ordered = sorted(samples)
+    rank = max(1, -(-len(ordered) * p // 100))
+    return ordered[int(rank) - 1]
+
+
+# 関数のピークメモリを計測する (tracemallocは遅くなるのでレイテンシとは別に測る)
+def measure_peak_memory(func: Callable[[], object]) -> int:
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+# 新しいプロセスでモジュールのimport時間を測る (ばらつきを抑えるため最小値を取る)
+def measure_import(module: str, runs: int = 3) -> ImportResult:
+    script = (
+        "import sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - start)\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n"
+    )
+    src_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    # Lambda上と同じ条件 (.envを読まない) で測る
+    env = {**os.environ, "AWS_LAMBDA_FUNCTION_NAME": "benchmark", "AWS_DEFAULT_REGION": REGION}
+    samples: list[float] = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=src_dir,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.splitlines()
+        samples.append(float(output[0]))
+    heavy_modules = tuple(m for m in (output[1:] or [""])[0].split(",") if m)
+    return ImportResult(module, min(samples), IMPORT_BUDGET_SECONDS[module], heavy_modules)
+
+
+# terraformと同じキー構成のテーブルとキャッシュ用バケットを作る (mock_aws内で呼ぶ)
+def create_resources() -> None:
+    boto3.client("dynamodb", region_name=REGION).create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[
+            {"AttributeName": "episode_id", "KeyType": "HASH"},
+            {"AttributeName": "line", "KeyType": "RANGE"},
+        ],
+        AttributeDefinitions=[
+            {"AttributeName": "episode_id", "AttributeType": "N"},
+            {"AttributeName": "line", "AttributeType": "N"},
+        ],
+        BillingMode="PROVISIONED",
+        ProvisionedThroughput={"ReadCapacityUnits": 20, "WriteCapacityUnits": 20},
+    )
+    boto3.client("s3", region_name=REGION).create_bucket(
+        Bucket=BUCKET_NAME,
+        CreateBucketConfiguration={"LocationConstraint": REGION},
+    )
+
+
+# バッチのlambda_handlerで作品全体を取り込む
+def run_ingest(work: SyntheticWork, server: CorpusServer, polite: bool = False) -> IngestResult:
+    sink: list[str] = []
+
+    def ingest():
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(patch.object(batch_lambda, "WORK_URLS", [server.work_url(work)]))
+            stack.enter_context(patch.object(batch_lambda, "TABLE_NAME", TABLE_NAME))
+            stack.enter_context(patch.object(batch_lambda, "BUCKET_NAME", BUCKET_NAME))
+            stack.enter_context(patch.object(batch_lambda, "metrics_sink", sink.append))
+            if not polite:
+                # サイトへの負荷軽減の待ち時間は計測対象外
+                stack.enter_context(patch("time.sleep", return_value=None))
+            batch_lambda.lambda_handler({"target_rate": 100}, None)
+
+    start = time.perf_counter()
+    ingest()
+    seconds = time.perf_counter() - start
+
+    pages = sum(json.loads(line).get("PagesFetched", 0) for line in sink)
+    return IngestResult(
+        episodes=len(work.episodes),
+        records=work.record_count,
+        seconds=seconds,
+        records_per_second=work.record_count / seconds,
+        pages_per_second=pages / seconds,
+        # 2回目は上書きになるだけなので、同じ内容でメモリを測る
+        peak_memory_bytes=measure_peak_memory(ingest),
+    )
+
+
+# バックエンドのlambda_handlerで各クラスのクエリを繰り返し投げる
+def run_queries(work: SyntheticWork, repeat: int) -> list[QueryResult]:
+    results: list[QueryResult] = []
+    for query_class, words in QUERY_CLASSES.items():
+        sink: list[str] = []
+        event = {"queryStringParameters": {"words": words, "work_id": str(work.work_id)}}
+
+        def query():
+            return backend_lambda.lambda_handler(event, None)
+
+        with patch.object(backend_lambda, "metrics_sink", sink.append):
+            samples: list[float] = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                query()
+                samples.append((time.perf_counter() - start) * 1000)
+            peak_memory_bytes = measure_peak_memory(query)
+
+        metrics = json.loads(sink[-1])
+        results.append(
+            QueryResult(
+                episodes=len(work.episodes),
+                query_class=query_class,
+                hits=int(metrics["ItemsReturned"]),
+                items_scanned=int(metrics["ItemsScanned"]),
+                p50_ms=percentile(samples, 50),
+                p95_ms=percentile(samples, 95),
+                peak_memory_bytes=peak_memory_bytes,
+            )
+        )
+    return results
+
+
+# クライアントを作り直した直後の初回リクエストを、ウォームアップの有無で比べる
+def run_cold_start(work: SyntheticWork, warm_ms: float) -> ColdStartResult:
+    event = {"queryStringParameters": {"words": QUERY_CLASSES["common"], "work_id": str(work.work_id)}}
+
+    def first_request(warmup: bool) -> float:
+        backend_lambda.get_table.cache_clear()
+        backend_lambda.get_s3_client.cache_clear()
+        # boto3はサービス定義の読み込みをキャッシュするので、セッションも作り直す
+        boto3.DEFAULT_SESSION = None
+        if warmup:
+            backend_lambda.lambda_handler({"warmup": True}, None)
+        start = time.perf_counter()
+        backend_lambda.lambda_handler(event, None)
+        return (time.perf_counter() - start) * 1000
+
+    with patch.object(backend_lambda, "metrics_sink", lambda line: None):
+        return ColdStartResult(
+            episodes=len(work.episodes),
+            cold_ms=first_request(warmup=False),
+            warmed_ms=first_request(warmup=True),
+            warm_ms=warm_ms,
+        )
+
+
+# コーパスサイズごとに、ローカルのAWS(moto)と小説サイトを立てて計測する
+def run(
+    sizes: list[int],
+    lines_per_episode: int = 80,
+    repeat: int = 20,
+    seed: int = 0,
+    polite: bool = False,
+) -> tuple[list[IngestResult], list[QueryResult], list[ColdStartResult]]:
+    ingests: list[IngestResult] = []
+    queries: list[QueryResult] = []
+    cold_starts: list[ColdStartResult] = []
+    env = {
+        "AWS_DEFAULT_REGION": REGION,
+        "TABLE_NAME": TABLE_NAME,
+        "BUCKET_NAME": BUCKET_NAME,
+    }
+    # Lambdaのログは計測結果の邪魔なので捨てる
+    with patch.dict(os.environ, env), open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        for size in sizes:
+            work = generate_work(WORK_ID, size, lines_per_episode, seed=seed)
+            with mock_aws(), CorpusServer([work]) as server:
+                create_resources()
+                ingests.append(run_ingest(work, server, polite))
+                results = run_queries(work, repeat)
+                queries.extend(results)
+                cold_starts.append(run_cold_start(work, results[0].p50_ms))
+            # mock_awsの外に作ったクライアントを持ち越さない
+            backend_lambda.get_table.cache_clear()
+            backend_lambda.get_s3_client.cache_clear()
+            batch_lambda.get_table.cache_clear()
+            batch_lambda.get_bucket.cache_clear()
+    return ingests, queries, cold_starts
+
+
+def format_report(
+    ingests: list[IngestResult],
+    queries: list[QueryResult],
+    cold_starts: list[ColdStartResult],
+    imports: list[ImportResult],
+) -> str:
+    rows = [
+        "Import",
+        f"{'module':>24} {'seconds':>9} {'budget':>9} {'heavy modules':>14}",
+    ]
+    rows += [
+        f"{r.module:>24} {r.seconds:>9.3f} {r.budget_seconds:>9.3f} {','.join(r.heavy_modules) or '-':>14}"
+        + ("  OVER BUDGET" if r.seconds > r.budget_seconds else "")
+        for r in imports
+    ]
+    rows += [
+        "",
+        "Ingest",
+        f"{'episodes':>9} {'records':>9} {'seconds':>9} {'records/s':>10} {'pages/s':>9} {'peak MiB':>9}",
+    ]
+    rows += [
+        f"{r.episodes:>9} {r.records:>9} {r.seconds:>9.2f} {r.records_per_second:>10.1f} "
+        f"{r.pages_per_second:>9.1f} {r.peak_memory_bytes / 2**20:>9.1f}"
+        for r in ingests
+    ]
+    rows += [
+        "",
+        "Search",
+        f"{'episodes':>9} {'class':>7} {'hits':>7} {'scanned':>9} {'p50 ms':>9} {'p95 ms':>9} {'peak MiB':>9}",
+    ]
+    rows += [
+        f"{r.episodes:>9} {r.query_class:>7} {r.hits:>7} {r.items_scanned:>9} "
+        f"{r.p50_ms:>9.1f} {r.p95_ms:>9.1f} {r.peak_memory_bytes / 2**20:>9.1f}"
+        for r in queries
+    ]
+    rows += [
+        "",
+        "First request (common)",
+        f"{'episodes':>9} {'cold ms':>9} {'warmed ms':>10} {'warm ms':>9}",
+    ]
+    rows += [
+        f"{r.episodes:>9} {r.cold_ms:>9.1f} {r.warmed_ms:>10.1f} {r.warm_ms:>9.1f}"
+        for r in cold_starts
+    ]
+    return "\n".join(rows)
@@ -0,0 +1,61 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from benchmark.corpus import SyntheticWork, render_episode, render_sidebar
+
+
+# 合成した作品のサイドバーと本文を配信するローカルの小説サイト
+# 本番のWORK_URLSと同じく作品URLは第1話のURL (/works/{work_id}/episodes/{episode_id}) で、
+# サイドバーはその後ろに /episode_sidebar を付けたURL
+class CorpusServer:
+    def __init__(self, works: list[SyntheticWork]):
+        # 配信中のHTML生成が取得時間に混ざらないよう、先に全部作っておく
+        self.pages: dict[str, bytes] = {}
+        for work in works:
+            self.pages[f"{self.work_path(work)}/episode_sidebar"] = render_sidebar(work).encode("utf-8")
+            for episode in work.episodes:
+                self.pages[f"/works/{work.work_id}/episodes/{episode.episode_id}"] = (
+                    render_episode(episode).encode("utf-8")
+                )
+
+        pages = self.pages
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = pages.get(self.path)
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            # アクセスログは出さない
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @staticmethod
+    def work_path(work: SyntheticWork) -> str:
+        return f"/works/{work.work_id}/episodes/{work.episodes[0].episode_id}"
+
+    # バッチのWORK_URLSに渡す作品URL
+    def work_url(self, work: SyntheticWork) -> str:
+        return f"{self.base_url}{self.work_path(work)}"
+
+    def __enter__(self) -> "CorpusServer":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,108 @@
+from bs4 import BeautifulSoup
+from functools import reduce
+
+from batch.lambda_function import get_all_li_elements, get_episodes, get_body_lines
+from benchmark.corpus import (
+    COMMON_WORD,
+    MISSING_WORD,
+    generate_work,
+    render_episode,
+    render_sidebar,
+)
+from benchmark.server import CorpusServer
+from benchmark.harness import IMPORT_BUDGET_SECONDS, measure_import, percentile, run
+
+
+###############################################################################
+# コーパス生成のテスト
+###############################################################################
+def test_generate_work_is_deterministic():
+    """同じ引数なら同じ作品が生成されること"""
+    assert generate_work(1, 5, seed=1) == generate_work(1, 5, seed=1)
+    assert generate_work(1, 5, seed=1) != generate_work(1, 5, seed=2)
+
+
+def test_generate_work_word_frequency():
+    """検索語が埋め込まれ、存在しない語は生成されないこと"""
+    work = generate_work(1, 20, lines_per_episode=50)
+    lines = [line for e in work.episodes for line in e.lines if line]
+
+    assert len(lines) == work.record_count
+    assert any(COMMON_WORD in line for line in lines)
+    assert not any(MISSING_WORD in line for line in lines)
+
+
+def test_rendered_html_is_readable_by_batch():
+    """生成したHTMLをバッチのパーサがそのまま読めること"""
+    work = generate_work(123, 12, lines_per_episode=10)
+
+    sidebar = BeautifulSoup(render_sidebar(work), "html.parser")
+    _, episodes = reduce(get_episodes, get_all_li_elements(sidebar), ("", []))
+    assert [e.episode_id for e in episodes] == [e.episode_id for e in work.episodes]
+    assert {e.work_id for e in episodes} == {123}
+    assert episodes[-1].sub_title == "第2章"
+
+    body = BeautifulSoup(render_episode(work.episodes[0]), "html.parser")
+    lines = list(get_body_lines(body))
+    assert [line.body for line in lines] == list(work.episodes[0].lines)
+
+
+###############################################################################
+# ローカル小説サイトのテスト
+###############################################################################
+def test_server_serves_production_url_shape():
+    """本番と同じ形の作品URLから、バッチと同じ手順でサイドバーと本文を辿れること"""
+    import requests
+
+    work = generate_work(123, 3, lines_per_episode=5)
+    with CorpusServer([work]) as server:
+        url = server.work_url(work)
+        assert url.endswith(f"/works/123/episodes/{work.episodes[0].episode_id}")
+        # フロントと同じ作品IDの取り出し方
+        assert url.split("/")[-3] == "123"
+
+        sidebar = requests.get(url + "/episode_sidebar")
+        assert sidebar.status_code == 200
+
+        url_prefix = url.split("/episodes/")[0] + "/episodes/"
+        episode = requests.get(url_prefix + str(work.episodes[-1].episode_id))
+        assert episode.status_code == 200
+        assert requests.get(server.base_url + "/works/123/episode_sidebar").status_code == 404
+
+
+###############################################################################
+# ハーネスのテスト
+###############################################################################
+def test_percentile():
+    samples = [float(n) for n in range(1, 101)]
+    assert percentile(samples, 50) == 50
+    assert percentile(samples, 95) == 95
+    assert percentile([3.0], 95) == 3
+
+
+def test_run_smoke():
+    """小さいコーパスでバッチ→検索まで一通り動くこと"""
+    ingests, queries, cold_starts = run([3], lines_per_episode=10, repeat=2)
+
+    work = generate_work(1000000000000001, 3, lines_per_episode=10)
+    assert len(ingests) == 1
+    assert ingests[0].records == work.record_count
+
+    by_class = {r.query_class: r for r in queries}
+    assert set(by_class) == {"common", "rare", "and", "miss"}
+    # 全件スキャンなので、どのクエリも全レコードを読む
+    assert all(r.items_scanned == work.record_count for r in queries)
+    assert by_class["miss"].hits == 0
+    assert by_class["common"].hits == sum(
+        COMMON_WORD in line for e in work.episodes for line in e.lines
+    )
+    assert len(cold_starts) == 1
+    assert cold_starts[0].warmed_ms > 0
+
+
+def test_import_budget():
+    """Lambdaモジュールのimportが予算内で、スクレイピング用のライブラリを読み込まないこと"""
+    for module in IMPORT_BUDGET_SECONDS:
+        result = measure_import(module, runs=1)
+        assert result.seconds < result.budget_seconds
+        assert result.heavy_modules == ()
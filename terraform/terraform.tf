@@ -154,6 +154,29 @@ resource "aws_lambda_function" "backend" {
   }
 }
 
+# backend warm-up (コールドスタート対策に定期的に接続を温めておく)
+resource "aws_cloudwatch_event_rule" "backend_warmup" {
+  name                = "backend-warmup"
+  schedule_expression = "rate(5 minutes)"
+  description         = "Keep backend lambda warm"
+}
+
+resource "aws_cloudwatch_event_target" "backend_warmup_target" {
+  rule = aws_cloudwatch_event_rule.backend_warmup.name
+  arn  = aws_lambda_function.backend.arn
+  input = jsonencode({
+    warmup = true
+  })
+}
+
+resource "aws_lambda_permission" "allow_eventbridge_warmup" {
+  statement_id  = "AllowEventBridgeWarmup"
+  action        = "lambda:InvokeFunction"
+  function_name = aws_lambda_function.backend.function_name
+  principal     = "events.amazonaws.com"
+  source_arn    = aws_cloudwatch_event_rule.backend_warmup.arn
+}
+
 resource "aws_apigatewayv2_api" "http_api" {
   name          = "novel-grep-api"
   protocol_type = "HTTP"